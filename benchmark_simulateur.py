@@ -0,0 +1,230 @@
+"""Benchmark suite for the bookstore accounting simulator.
+
+Times and memory-profiles each stage separately over a matrix of year spans and
+volume multipliers, writes the results as JSON (stable key order, so two runs can
+be diffed) and flags stages whose time grows worse than linearly with their rows.
+
+    python benchmark_simulateur.py --years 1 3 5 --volumes 1 2 4 --output bench.json
+    python benchmark_simulateur.py --compare bench_before.json bench_after.json
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import random
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+import simulateur_comptabilite_page_turner as simulateur
+
+DEFAULT_YEAR_SPANS = [1, 3, 5]
+DEFAULT_VOLUMES = [1, 2, 4]
+# Time ~ rows ** exponent; above this the stage is flagged as worse than linear
+SUPERLINEAR_EXPONENT = 1.15
+STAGES = ["invoices", "salaries", "misc_entries", "vat_settlement", "financial_statements",
+          "cotations_devises", "ageing", "validation", "create_excel_file"]
+
+def benchmark_params(years, volume, seed):
+    """Simulation parameters for one point of the matrix (volume scales the invoice counts)"""
+    start_year = 2021
+    params = simulateur.SimulationParams(
+        start_year=start_year, end_year=start_year + years - 1, seed=seed, batch_mode=True,
+        supplier_invoices_per_year=50 * volume, client_invoices_per_year=60 * volume
+    )
+    # Spans past the known rates keep the last VAT rate
+    last_rate = params.tva_rates[max(params.tva_rates)]
+    for year in range(start_year, params.end_year + 1):
+        params.tva_rates.setdefault(year, last_rate)
+    return params
+
+def measure(stage, repeat, reset=None):
+    """Run a stage, return (result, best wall time, CPU time, tracemalloc peak in bytes).
+
+    Timings come from untraced runs; the memory peak from one extra traced run,
+    since tracemalloc slows allocation-heavy code down considerably. reset() runs
+    before every call, untimed, to drop state a previous call left warm.
+    """
+    wall_times, cpu_times = [], []
+    for _ in range(repeat):
+        if reset:
+            reset()
+        wall, cpu = time.perf_counter(), time.process_time()
+        result = stage()
+        wall_times.append(time.perf_counter() - wall)
+        cpu_times.append(time.process_time() - cpu)
+    if reset:
+        reset()
+    tracemalloc.start()
+    stage()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    best = int(np.argmin(wall_times))
+    return result, wall_times[best], cpu_times[best], peak
+
+def run_case(years, volume, seed, repeat, output_dir):
+    """Benchmark every stage for one (year span, volume) point"""
+    params = benchmark_params(years, volume, seed)
+    generator = simulateur.AccountingDataGenerator(params)
+    year_range = list(range(params.start_year, params.end_year + 1))
+    starts = generator.document_number_starts()
+    state = {}
+
+    def invoices():
+        random.seed(seed)
+        frames, factures_fournisseurs, factures_clients = [], [], []
+        for year in year_range:
+            numero_document = starts[year]
+            fournisseurs, supplier_entries = generator.generate_supplier_invoices_batch(year, numero_document, params.supplier_invoices_per_year)
+            clients, client_entries = generator.generate_client_invoices_batch(year, numero_document + len(fournisseurs), params.client_invoices_per_year)
+            frames += [supplier_entries, client_entries]
+            factures_fournisseurs.append(fournisseurs)
+            factures_clients.append(clients)
+        return frames, pd.concat(factures_fournisseurs, ignore_index=True), pd.concat(factures_clients, ignore_index=True)
+
+    def salaries():
+        return simulateur.concat_ledgers([generator.generate_salary_entries(year) for year in year_range])
+
+    def misc_entries():
+        return [entry for year in year_range for entry in generator.generate_misc_entries(year)]
+
+    def vat_settlement():
+        return [entry for year in year_range for entry in generator.generate_vat_settlement(state["journal_df"], year)]
+
+    def financial_statements():
+        return generator.generate_financial_statements(state["journal_df"])
+
+    def cotations_devises():
+        return generator.generate_cotations_devises_rows()
+
+    def ageing():
+        factures = {"FacturesFournisseurs": state["invoices"][1], "FacturesClients": state["invoices"][2]}
+        return generator.generate_ageing({table_name: simulateur.invoice_intervals(table_name, df) for table_name, df in factures.items()})
+
+    def reset_ledger_index():
+        # The generator keeps the index of the last ledger it queried: every consumer pays for its own
+        generator._ledger_index = None
+
+    def validation():
+        return simulateur.LedgerValidator(generator.accounts).validate(
+            state["data"]["GrandLivre"], state["data"]["FacturesFournisseurs"], state["data"]["FacturesClients"])
+
+    def create_excel_file():
+        exporter = simulateur.ExcelGenerator(params, output_dir)
+        return exporter.create_excel_file(state["data"], os.path.join(output_dir, "benchmark.xlsx"))
+
+    results = {}
+    for name, stage in [("invoices", invoices), ("salaries", salaries), ("misc_entries", misc_entries)]:
+        state[name], wall, cpu, peak = measure(stage, repeat)
+        rows = sum(len(frame) for frame in state[name][0]) if name == "invoices" else len(state[name])
+        results[name] = {"wall_s": wall, "cpu_s": cpu, "tracemalloc_peak_bytes": peak, "rows": rows}
+    frames, factures_fournisseurs, factures_clients = state["invoices"]
+    frames = frames + [state["salaries"], pd.DataFrame(state["misc_entries"], columns=simulateur.GRAND_LIVRE_COLUMNS)]
+    state["journal_df"] = simulateur.concat_ledgers(frames)
+    # Consumers are measured against the ledger they read
+    ledger_rows = len(state["journal_df"])
+    for name, stage in [("vat_settlement", vat_settlement), ("financial_statements", financial_statements),
+                        ("cotations_devises", cotations_devises), ("ageing", ageing)]:
+        state[name], wall, cpu, peak = measure(stage, repeat, reset_ledger_index)
+        rows = {"cotations_devises": len(state[name]), "ageing": len(factures_fournisseurs) + len(factures_clients)}.get(name, ledger_rows)
+        results[name] = {"wall_s": wall, "cpu_s": cpu, "tracemalloc_peak_bytes": peak, "rows": rows}
+    vat_df = pd.DataFrame(state["vat_settlement"], columns=simulateur.GRAND_LIVRE_COLUMNS)
+    balance_df, etat_resultat_df = state["financial_statements"]
+    data = {"GrandLivre": simulateur.concat_ledgers([state["journal_df"], vat_df])}
+    data.update(generator.generate_reference_tables())
+    data.update({
+        "FacturesFournisseurs": factures_fournisseurs,
+        "FacturesClients": factures_clients,
+        "CotationsDevises": state["cotations_devises"],
+        "BalanceDesComptes": balance_df,
+        "BalanceMensuelle": generator.generate_monthly_balances(state["journal_df"]),
+        **state["ageing"],
+        "Bilan": balance_df,
+        "EtatDeResultat": etat_resultat_df
+    })
+    state["data"] = {table_name: data[table_name] for table_name in simulateur.TABLE_NAMES}
+    _, wall, cpu, peak = measure(validation, repeat)
+    results["validation"] = {"wall_s": wall, "cpu_s": cpu, "tracemalloc_peak_bytes": peak, "rows": len(data["GrandLivre"])}
+    _, wall, cpu, peak = measure(create_excel_file, repeat)
+    results["create_excel_file"] = {"wall_s": wall, "cpu_s": cpu, "tracemalloc_peak_bytes": peak,
+                                    "rows": sum(len(df) for df in state["data"].values())}
+    for stage_result in results.values():
+        stage_result["rows_per_s"] = stage_result["rows"] / stage_result["wall_s"] if stage_result["wall_s"] else None
+    return {"years": years, "volume": volume, "ledger_rows": len(data["GrandLivre"]), "stages": results}
+
+def scaling_exponents(cases):
+    """Fit time ~ rows ** k per stage across the matrix (least squares on log-log)"""
+    exponents = {}
+    for stage in STAGES:
+        points = [(case["stages"][stage]["rows"], case["stages"][stage]["wall_s"]) for case in cases]
+        points = [(rows, wall) for rows, wall in points if rows > 0 and wall > 0]
+        if len({rows for rows, _ in points}) < 2:
+            exponents[stage] = {"exponent": None, "superlinear": False}
+            continue
+        log_rows, log_wall = np.log([p[0] for p in points]), np.log([p[1] for p in points])
+        exponent = float(np.polyfit(log_rows, log_wall, 1)[0])
+        exponents[stage] = {"exponent": round(exponent, 3), "superlinear": exponent > SUPERLINEAR_EXPONENT}
+    return exponents
+
+def run_benchmarks(year_spans=DEFAULT_YEAR_SPANS, volumes=DEFAULT_VOLUMES, seed=0, repeat=1):
+    """Run the whole matrix, return the JSON-serialisable results"""
+    cases = []
+    with tempfile.TemporaryDirectory() as output_dir:
+        for years in year_spans:
+            for volume in volumes:
+                logging.warning(f"Benchmarking {years} year(s) x volume {volume}")
+                cases.append(run_case(years, volume, seed, repeat, output_dir))
+    return {
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "pandas": pd.__version__,
+            "numpy": np.__version__
+        },
+        "seed": seed,
+        "repeat": repeat,
+        "cases": cases,
+        "scaling": scaling_exponents(cases)
+    }
+
+def compare_results(before, after):
+    """Per-stage wall-time ratio (after / before) for the cases present in both runs"""
+    before_cases = {(case["years"], case["volume"]): case for case in before["cases"]}
+    ratios = {}
+    for case in after["cases"]:
+        key = (case["years"], case["volume"])
+        if key not in before_cases:
+            continue
+        for stage, result in case["stages"].items():
+            before_wall = before_cases[key]["stages"][stage]["wall_s"]
+            ratios.setdefault(stage, {})[f"{key[0]}y_x{key[1]}"] = round(result["wall_s"] / before_wall, 3) if before_wall else None
+    return ratios
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the simulator stages over year spans and volumes")
+    parser.add_argument("--years", type=int, nargs="+", default=DEFAULT_YEAR_SPANS, help="year spans to simulate")
+    parser.add_argument("--volumes", type=int, nargs="+", default=DEFAULT_VOLUMES, help="invoice volume multipliers")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=1, help="timed runs per stage (best is kept)")
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"), help="compare two result files instead of running")
+    args = parser.parse_args()
+    logging.getLogger().setLevel(logging.WARNING)
+    if args.compare:
+        with open(args.compare[0]) as before, open(args.compare[1]) as after:
+            print(json.dumps(compare_results(json.load(before), json.load(after)), indent=2, sort_keys=True))
+        return
+    results = run_benchmarks(args.years, args.volumes, args.seed, args.repeat)
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+    for stage, scaling in results["scaling"].items():
+        flag = "  <-- worse than linear" if scaling["superlinear"] else ""
+        print(f"{stage:22s} exponent {scaling['exponent']}{flag}")
+    print(f"Results written to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,613 @@
+"""Regression tests of the bookstore accounting simulator.
+
+    python -m pytest -q
+"""
+import copy
+import json
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import simulateur_comptabilite_page_turner as simulateur
+
+def test_config_payroll_rates_extend_the_payroll_schedule(tmp_path, capsys):
+    """payroll_rates from --config are added to the default payroll schedule, not to the VAT rates"""
+    rates_2023 = {"avs": {"employe": 0.053, "employeur": 0.053}, "laa": {"employe": 0.014, "employeur": 0.006},
+                  "ijm": {"employe": 0.005, "employeur": 0.005}, "lpp": {"employe": 0.04, "employeur": 0.04},
+                  "impot_source": {"employe": 0.05, "employeur": 0.0}}
+    config = tmp_path / "config.json"
+    config.write_text(json.dumps({"payroll_rates": {"2023": rates_2023}, "tva_rates": {"2026": 8.1}}))
+    args = simulateur.build_parser().parse_args(["--config", str(config), "--output", str(tmp_path)])
+    params = simulateur.params_from_args(args)
+    assert sorted(params.payroll_rates) == [2021, 2023]
+    assert params.payroll_rates[2023] == rates_2023
+    assert params.tva_rates[2026] == 8.1 and 2021 in params.tva_rates
+    assert simulateur.validate_params(params) == []
+    simulateur.main(["--config", str(config), "--output", str(tmp_path), "--validate-config"])
+    assert "Configuration OK" in capsys.readouterr().out
+
+def test_config_rejects_vat_rates_given_as_fractions(tmp_path):
+    """tva_rates are percentages, like the defaults: 0.081 would book a VAT of 0.081 %"""
+    config = tmp_path / "config.json"
+    config.write_text(json.dumps({"tva_rates": {"2026": 0.081}}))
+    args = simulateur.build_parser().parse_args(["--config", str(config), "--output", str(tmp_path)])
+    assert any("2026" in error and "percentages" in error for error in simulateur.validate_params(simulateur.params_from_args(args)))
+    with pytest.raises(SystemExit):
+        simulateur.main(["--config", str(config), "--output", str(tmp_path), "--validate-config"])
+
+@pytest.mark.parametrize("engine, batch_mode", [("batch", True), ("rows", False)])
+def test_engine_option_overrides_the_config(tmp_path, engine, batch_mode):
+    config = tmp_path / "config.json"
+    config.write_text(json.dumps({"batch_mode": not batch_mode}))
+    args = simulateur.build_parser().parse_args(["--config", str(config), "--engine", engine, "--output", str(tmp_path)])
+    assert simulateur.params_from_args(args).batch_mode is batch_mode
+
+def test_config_rejects_invalid_payroll_rates(tmp_path):
+    config = tmp_path / "config.json"
+    config.write_text(json.dumps({"payroll_rates": {"2022": {"avs": {"employe": 1.5}}}}))
+    with pytest.raises(SystemExit):
+        simulateur.main(["--config", str(config), "--output", str(tmp_path), "--validate-config"])
+
+@pytest.fixture(scope="module")
+def generated():
+    """Two years of the default company (batch engine)"""
+    params = simulateur.SimulationParams(start_year=2021, end_year=2022, seed=7, batch_mode=True)
+    generator = simulateur.AccountingDataGenerator(params)
+    return generator, generator.generate_all_data()
+
+def test_batch_engine_keeps_the_invoice_rules():
+    """A year of 4000 invoices a side follows the per-invoice rules: payment and transport-fee rates, VAT, totals"""
+    params = simulateur.SimulationParams(start_year=2023, end_year=2023, seed=1, batch_mode=True)
+    params.supplier_invoices_per_year = params.client_invoices_per_year = 4000
+    generator = simulateur.AccountingDataGenerator(params)
+    journal_df, fournisseurs, clients = generator.generate_year_from_stream(2023, 1)
+    vat_rate = params.tva_rates[2023]
+    assert (fournisseurs["StatutFacture"] == "ERLED").mean() == pytest.approx(params.supplier_paid_rate, abs=0.02)
+    assert (clients["StatutFacture"] == "ERLED").mean() == pytest.approx(params.client_paid_rate, abs=0.02)
+    libelles = journal_df["Libelle"]
+    fees = journal_df[libelles.str.startswith("Frais de transport")]
+    assert fees["RefDocument"].nunique() / len(fournisseurs) == pytest.approx(params.transport_fee_rate, abs=0.02)
+    assert (libelles.str.startswith("Paiement facture").sum(), libelles.str.startswith("Encaissement facture").sum()) == \
+        ((fournisseurs["StatutFacture"] == "ERLED").sum(), (clients["StatutFacture"] == "ERLED").sum())
+    # Supplier invoices: net and input VAT (1170-1172) credited to 2000, for MontantCHF in all
+    booked = journal_df[libelles.str.startswith(("Facture F-", "TVA sur facture F-"))]
+    vat = booked[booked["Libelle"].str.startswith("TVA")]
+    assert set(vat["CompteDebit"]) == {1170, 1171, 1172} and (booked["CompteCredit"] == 2000).all()
+    net = booked[booked["Libelle"].str.startswith("Facture")].set_index("RefDocument")["MontantDebit"]
+    assert (vat.set_index("RefDocument")["MontantDebit"] - (net * vat_rate / 100).round(2)).abs().max() < 0.005
+    totals = booked.groupby("RefDocument")["MontantCredit"].sum()
+    assert (totals - fournisseurs.set_index("RefDocument")["MontantCHF"]).abs().max() < 0.005
+    # Client invoices: MontantCHF debited to 1100, VAT included in it
+    booked = journal_df[libelles.str.startswith(("Facture C-", "TVA sur facture C-"))]
+    assert (booked["CompteDebit"] == 1100).all()
+    montants = clients.set_index("RefDocument")["MontantCHF"]
+    assert (booked.groupby("RefDocument")["MontantDebit"].sum() - montants).abs().max() < 0.005
+    vat = booked[booked["CompteCredit"] == 2200].set_index("RefDocument")["MontantCredit"]
+    assert (vat - (montants * vat_rate / (100 + vat_rate)).round(2)).abs().max() < 0.005
+
+def comparable(df):
+    """A table as any backend reads it back: dates as datetime64[ns], date keys as Int32, missing texts as "" """
+    df = df.copy()
+    for column in df.columns:
+        if column in simulateur.DATE_COLUMNS:
+            df[column] = simulateur.ledger_dates(df, column).astype("datetime64[ns]")
+        elif column.startswith("Cle") and column[3:] in simulateur.DATE_COLUMNS:
+            df[column] = df[column].astype("Int32")
+        elif not pd.api.types.is_numeric_dtype(df[column]):
+            df[column] = df[column].astype(object).fillna("")
+    return df
+
+def assert_exported(exporter, data):
+    """Every table of data reads back from the export unchanged (partitioned tables in any row order)"""
+    for table_name, df in data.items():
+        tables = [comparable(exporter.read_table(table_name)), comparable(df)]
+        if table_name in simulateur.PARTITIONED_TABLES:
+            tables = [table.sort_values(list(table.columns), ignore_index=True) for table in tables]
+        pd.testing.assert_frame_equal(*tables, check_dtype=False, obj=table_name)
+
+@pytest.mark.parametrize("excel_streaming", [False, True])
+def test_excel_export_reads_back_as_named_tables(generated, tmp_path, excel_streaming):
+    """Both workbook writers give every table back, sized and declared as the named table PowerBI loads"""
+    from openpyxl import load_workbook
+    generator, data = generated
+    params = copy.copy(generator.params)
+    params.excel_streaming = excel_streaming
+    params.excel_batch_size = 500
+    exporter = simulateur.get_exporter("excel", params, str(tmp_path))
+    exporter.export_all_data(data)
+    assert_exported(exporter, data)
+    workbook = load_workbook(exporter.dataset_path)
+    assert workbook.sheetnames == list(data)
+    for table_name, df in data.items():
+        sheet = workbook[table_name]
+        assert list(sheet.tables) == [f"Table_{table_name}"]
+        assert sheet.tables[f"Table_{table_name}"].ref == f"A1:{sheet.cell(1, len(df.columns)).column_letter}{len(df) + 1}"
+        assert sheet.column_dimensions["A"].width > len(df.columns[0])
+
+@pytest.mark.parametrize("format_name", ["csv", "parquet"])
+def test_columnar_exports_read_back(generated, tmp_path, format_name):
+    """CSV and Parquet give every table back, dates and date keys included"""
+    generator, data = generated
+    exporter = simulateur.get_exporter(format_name, generator.params, str(tmp_path))
+    exporter.export_all_data(data)
+    assert_exported(exporter, data)
+
+def test_parquet_partitions_hold_their_fiscal_year(generated, tmp_path):
+    """Partitioned tables have one Exercice=YYYY directory per year of their date, typed for PowerBI"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    generator, data = generated
+    exporter = simulateur.get_exporter("parquet", generator.params, str(tmp_path))
+    exporter.export_all_data(data)
+    for table_name, date_column in simulateur.PARTITIONED_TABLES.items():
+        path = tmp_path / "BookstoreAccountingData_parquet" / table_name
+        years = sorted(int(partition.name.split("=")[1]) for partition in path.iterdir())
+        assert years == sorted(simulateur.ledger_dates(data[table_name], date_column).dt.year.unique())
+        for year in years:
+            table = pq.read_table(path / f"Exercice={year}")
+            assert table.schema.field(date_column).type == pa.date32()
+            assert {date.year for date in table.column(date_column).to_pylist()} == {year}
+        assert len(exporter.read_table(table_name, since_year=2022)) == \
+            (simulateur.ledger_dates(data[table_name], date_column).dt.year >= 2022).sum()
+    schema = pq.read_schema(next((tmp_path / "BookstoreAccountingData_parquet" / "GrandLivre").rglob("*.parquet")))
+    assert schema.field("CompteDebit").type == pa.int32() and schema.field("MontantDebit").type == pa.float64()
+
+def test_compact_ledger_holds_the_same_rows_in_fewer_bytes(generated):
+    """The typed ledger renders back to the default one, with datetime64 dates, int16 accounts and categories"""
+    generator, data = generated
+    params = copy.copy(generator.params)
+    params.compact_ledger = True
+    compact_df = simulateur.AccountingDataGenerator(params).generate_accounting_data()[0]
+    journal_df = data["GrandLivre"][simulateur.GRAND_LIVRE_COLUMNS]
+    assert pd.api.types.is_datetime64_any_dtype(compact_df["Date"])
+    assert (compact_df["CompteDebit"].dtype, compact_df["CompteCredit"].dtype) == (np.int16, np.int16)
+    assert isinstance(compact_df["CodeAnalytique"].dtype, pd.CategoricalDtype)
+    pd.testing.assert_frame_equal(simulateur.render_dates(compact_df).astype(object), journal_df.astype(object))
+    assert simulateur.ledger_memory_per_row(compact_df) < 0.8 * simulateur.ledger_memory_per_row(journal_df)
+
+def test_payroll_books_both_sides(generated):
+    """Salaires à payer clears every month and the charges reach their liability accounts"""
+    _, data = generated
+    balances = data["BalanceMensuelle"].set_index(["Compte", "Annee", "Mois"])
+    assert (balances.loc[2299, "SoldeCloture"].abs() < 0.005).all()
+    bilan = data["Bilan"].set_index("Compte")
+    assert (bilan.loc[2299].filter(like="SoldeExercice").abs() < 0.005).all()
+    payroll = data["GrandLivre"][data["GrandLivre"]["RefDocument"].str.startswith("SAL-")]
+    for account in [2270, 2271, 2272, 2273, 2279]:
+        credited = payroll.loc[payroll["CompteCredit"] == account, "MontantCredit"].sum()
+        assert credited > 0
+        assert balances.loc[account, "Credit"].sum() == pytest.approx(credited)
+
+def test_default_ledger_passes_validation(generated):
+    generator, data = generated
+    validator = simulateur.LedgerValidator(generator.accounts)
+    violations = validator.validate(data["GrandLivre"], data["FacturesFournisseurs"], data["FacturesClients"])
+    assert violations.empty, validator.summary(violations)
+
+def test_validator_reads_the_ledger_like_the_statements(generated):
+    """A salary posting missing its credit amount is flagged, and leaves 2299 open as it does in Bilan"""
+    generator, data = generated
+    journal_df = data["GrandLivre"].copy()
+    gross = np.flatnonzero(journal_df["CompteCredit"] == 2299)[0]
+    journal_df.loc[gross, "MontantCredit"] = np.nan
+    violations = simulateur.LedgerValidator(generator.accounts).validate(journal_df)
+    assert violations["Controle"].tolist() == ["montant_invalide", "salaires_non_soldes"]
+
+def test_vat_settlement_clears_every_quarter(generated):
+    """Each quarter's VAT postings, found row by row, are cleared by the settlement rows of that quarter"""
+    _, data = generated
+    rows = simulateur.render_dates(data["GrandLivre"]).to_dict("records")
+    settled = 0
+    for year in [2021, 2022]:
+        for quarter in range(1, 5):
+            ref_document = f"TVA-{year}-Q{quarter}"
+            for account in [1170, 1171, 1172, 2200]:
+                balance = 0.0
+                for row in rows:
+                    date = datetime.strptime(row["Date"], "%d.%m.%Y")
+                    in_quarter = date.year == year and (date.month + 2) // 3 == quarter and not row["RefDocument"].startswith("TVA-")
+                    if in_quarter or row["RefDocument"] == ref_document:
+                        settled += row["RefDocument"] == ref_document
+                        if row["CompteDebit"] == account:
+                            balance += row["MontantDebit"]
+                        if row["CompteCredit"] == account:
+                            balance -= row["MontantCredit"]
+                assert balance == pytest.approx(0.0, abs=0.01), (ref_document, account)
+    assert settled
+
+def test_vat_settlement_pays_the_output_vat():
+    """A quarter whose sales VAT exceeds the input VAT pays the difference (2200/1010)"""
+    params = simulateur.SimulationParams(start_year=2023, end_year=2024, seed=7, batch_mode=True)
+    generator = simulateur.AccountingDataGenerator(params)
+    journal_df = generator.generate_all_data()["GrandLivre"]
+    balances = generator.compute_vat_balances(journal_df[~journal_df["RefDocument"].str.startswith("TVA-")])
+    due = -balances.sum(axis=1).round(2)
+    assert (due > 0).any()
+    payments = journal_df[journal_df["Libelle"].str.startswith("Paiement TVA")]
+    assert len(payments) == (due > 0).sum()
+    for (year, quarter), amount in due[due > 0].items():
+        payment = payments[payments["RefDocument"] == f"TVA-{year}-Q{quarter}"]
+        assert payment[["CompteDebit", "CompteCredit"]].values.tolist() == [[2200, 1010]]
+        assert payment["MontantDebit"].item() == payment["MontantCredit"].item() == pytest.approx(amount)
+
+def test_supplier_payables_stay_open_until_paid(generated):
+    """2000 carries the invoices (transport fees included) still unpaid at each year end"""
+    _, data = generated
+    factures = data["FacturesFournisseurs"]
+    journal_df = data["GrandLivre"]
+    fees = journal_df[journal_df["CompteDebit"] == 4201].groupby("RefDocument")["MontantDebit"].sum()
+    owed = factures["MontantCHF"] + factures["RefDocument"].map(fees).fillna(0.0)
+    balances = data["BalanceMensuelle"].set_index(["Compte", "Annee", "Mois"])["Solde"]
+    for year in [2021, 2022]:
+        year_end = pd.Timestamp(year, 12, 31)
+        invoiced = pd.to_datetime(factures["DateFacture"], format="%d.%m.%Y") <= year_end
+        paid = pd.to_datetime(factures["DatePaiement"], format="%d.%m.%Y") <= year_end
+        open_payables = owed[invoiced & ~paid].sum()
+        assert open_payables > 0
+        assert balances[(2000, year, 12)] == pytest.approx(open_payables, abs=0.01)
+
+@pytest.mark.parametrize("frequency", ["monthly", "daily"])
+def test_rates_do_not_depend_on_the_simulated_range(frequency):
+    """start_year and end_year stay out of the cache key, so a date's rate must not depend on them"""
+    tables = []
+    for start_year, end_year in [(2021, 2022), (2020, 2023)]:
+        params = simulateur.SimulationParams(start_year=start_year, end_year=end_year, seed=3)
+        params.cotation_frequency = frequency
+        cotations = simulateur.AccountingDataGenerator(params).generate_cotations_devises()
+        tables.append(cotations.set_index(["CodeMonnaie", "DateCotation"])["Taux"])
+    assert tables[0].equals(tables[1].loc[tables[0].index])
+
+def test_cached_years_convert_at_the_exported_rates(tmp_path):
+    """A year served from the cache converts its invoices at the CotationsDevises of the new run"""
+    for end_year in [2022, 2023]:
+        params = simulateur.SimulationParams(start_year=2021, end_year=end_year, seed=3, batch_mode=True)
+        params.cotation_frequency = "daily"
+        params.cache_dir = str(tmp_path)
+        data = simulateur.AccountingDataGenerator(params).generate_all_data()
+    factures = data["FacturesClients"]
+    foreign = factures[factures["Monnaie"] != "CHF"].iloc[0]
+    cotations = data["CotationsDevises"]
+    rate = cotations.loc[(cotations["CodeMonnaie"] == foreign["Monnaie"]) & (cotations["DateCotation"] == foreign["DateFacture"]), "Taux"]
+    assert foreign["MontantCHF"] == pytest.approx(foreign["Montant"] * rate.item(), abs=0.01)
+
+def reference_financial_statements(generator, journal_df):
+    """The former per-account, per-year statements: one filter of the whole ledger per account and year.
+
+    Bilan carries each year's closing balance, the previous one plus the year's movements.
+    """
+    params = generator.params
+    years = range(params.start_year, params.end_year + 1)
+    resultat_rows, balance_rows = [], []
+    for account_id, account_info in generator.accounts.items():
+        category = account_info["category"]
+        if category not in ["Produit", "Charge", "Actif", "Passif"] or account_id == 2979:
+            continue
+        row = {"Compte": account_id, "Intitule": account_info["name"]}
+        solde = closing = 0.0
+        for year in years:
+            year_entries = journal_df[journal_df["Date"].str.contains(str(year))]
+            debit_sum = year_entries[year_entries["CompteDebit"] == account_id]["MontantDebit"].sum()
+            credit_sum = year_entries[year_entries["CompteCredit"] == account_id]["MontantCredit"].sum()
+            if category in ["Produit", "Charge"]:
+                # Products negative, charges positive
+                row[f"MontantExercice{year - params.start_year + 1}"] = round(debit_sum - credit_sum, 2)
+                solde += debit_sum - credit_sum
+            else:
+                balance = debit_sum - credit_sum if category == "Actif" else credit_sum - debit_sum
+                closing += round(balance, 2)
+                row[f"SoldeExercice{year - params.start_year + 1}"] = round(closing, 2)
+        if category in ["Produit", "Charge"]:
+            row["Solde"] = round(solde, 2)
+            resultat_rows.append(row)
+        else:
+            balance_rows.append(row)
+    resultat_df = pd.DataFrame(resultat_rows)
+    result_row = {"Compte": 2979, "Intitule": "Bénéfice/perte"}
+    result = 0.0
+    for year in years:
+        result += resultat_df[f"MontantExercice{year - params.start_year + 1}"].sum()
+        result_row[f"SoldeExercice{year - params.start_year + 1}"] = round(result, 2)
+    balance_df = pd.DataFrame(balance_rows + [result_row])
+    return balance_df, resultat_df
+
+@pytest.mark.parametrize("batch_mode, compact_ledger", [(True, False), (False, False), (True, True)])
+def test_financial_statements_match_the_reference(batch_mode, compact_ledger):
+    """The grouped Bilan and EtatDeResultat equal the per-account reference, to the centime"""
+    params = simulateur.SimulationParams(start_year=2021, end_year=2023, seed=11, batch_mode=batch_mode, compact_ledger=compact_ledger)
+    generator = simulateur.AccountingDataGenerator(params)
+    data = generator.generate_all_data()
+    expected = reference_financial_statements(generator, simulateur.render_dates(data["GrandLivre"]))
+    for statement, expected_df in zip(["Bilan", "EtatDeResultat"], expected):
+        pd.testing.assert_frame_equal(data[statement], expected_df, check_dtype=False, check_exact=False, atol=0.01)
+
+def test_streaming_pipeline_exports_the_in_memory_tables(generated, tmp_path):
+    """Year-by-year generation gives the in-memory run's tables; only GrandLivre's row order changes"""
+    generator, data = generated
+    params = copy.copy(generator.params)
+    params.streaming_pipeline = True
+    exporter = simulateur.get_exporter("parquet", params, str(tmp_path))
+    chunks = []
+    write_chunk = exporter.write_chunk
+    exporter.write_chunk = lambda table_name, df: (chunks.append((table_name, len(df))), write_chunk(table_name, df))
+    _, journal_rows, _ = simulateur.AccountingDataGenerator(params).stream_all_data([exporter])
+    # One GrandLivre chunk a year: a year's ledger is all the pipeline holds
+    ledger_chunks = [rows for table_name, rows in chunks if table_name == "GrandLivre"]
+    assert len(ledger_chunks) == 2 and sum(ledger_chunks) == journal_rows == len(data["GrandLivre"])
+    assert_exported(exporter, data)
+
+def test_pipelined_export_records_writer_threads_on_their_own(tmp_path):
+    """Writer threads report their own CPU time, merged into the run report next to the real elapsed time"""
+    params = simulateur.SimulationParams(start_year=2021, end_year=2022, seed=5, batch_mode=True)
+    params.pipelined_export = True
+    params.export_formats = ["csv"]
+    params.output_dir = str(tmp_path)
+    params.report_path = str(tmp_path / "report.json")
+    generator = simulateur.AccountingDataGenerator(params)
+    simulateur.run_simulation(generator)
+    report = json.loads((tmp_path / "report.json").read_text())
+    writer, producer = report["stages"]["export_csv"], report["stages"]["export_csv_queue"]
+    assert writer["rows"] > 0 and writer["rss_peak_growth_bytes"] is None
+    assert producer["cpu_s"] <= producer["wall_s"] + 0.01
+    assert report["elapsed_s"] > 0
+
+@pytest.mark.parametrize("chart_variant", ["e_commerce", "edition"])
+def test_chart_variant_accounts_carry_activity(chart_variant):
+    """Every account a variant adds takes part of its base account's postings, through to the statements"""
+    params = simulateur.SimulationParams(start_year=2021, end_year=2021, seed=2, batch_mode=True)
+    params.chart_variant = chart_variant
+    data = simulateur.AccountingDataGenerator(params).generate_all_data()
+    resultat = data["EtatDeResultat"].set_index("Compte")["Solde"]
+    for base_account, (own_account, _) in simulateur.CHART_VARIANT_ROUTES[chart_variant].items():
+        assert resultat[own_account] != 0 and resultat[base_account] != 0
+
+def test_run_simulation_returns_the_statement_sums(tmp_path):
+    """The account x year sums run_simulation returns rebuild the run's statements"""
+    params = simulateur.SimulationParams(start_year=2021, end_year=2022, seed=9, batch_mode=True)
+    params.export_formats = ["csv"]
+    params.output_dir = str(tmp_path)
+    params.report_path = str(tmp_path / "report.json")
+    generator = simulateur.AccountingDataGenerator(params)
+    _, _, sums = simulateur.run_simulation(generator)
+    # The sums of the financial_statements stage, not a second aggregation of the ledger
+    assert sums is generator.account_year_sums
+    debit, credit = sums
+    _, resultat_df = generator.financial_statements_from_sums(debit, credit)
+    expected = simulateur.AccountingDataGenerator(params).generate_all_data()["EtatDeResultat"]
+    pd.testing.assert_frame_equal(resultat_df, expected)
+
+def exported_bytes(directory):
+    return {path.relative_to(directory): path.read_bytes() for path in sorted(directory.rglob("*")) if path.is_file()}
+
+@pytest.mark.parametrize("batch_mode", [True, False])
+def test_worker_count_does_not_change_the_dataset(tmp_path, batch_mode):
+    """Every year comes from its own stream, whether generated in-process or in a pool"""
+    exports = []
+    for workers in [None, 1, 3]:
+        params = simulateur.SimulationParams(start_year=2021, end_year=2023, seed=4, batch_mode=batch_mode)
+        params.workers = workers
+        params.export_formats = ["csv"]
+        params.output_dir = str(tmp_path / f"workers-{workers}")
+        params.report_path = str(tmp_path / f"report-{workers}.json")
+        simulateur.run_simulation(simulateur.AccountingDataGenerator(params))
+        exports.append(exported_bytes(tmp_path / f"workers-{workers}"))
+    assert exports[0] and exports[0] == exports[1] == exports[2]
+
+@pytest.mark.parametrize("batch_mode", [True, False])
+def test_year_cache_does_not_change_the_dataset(tmp_path, batch_mode):
+    """A run filling the cache and a run served from it export what an uncached run does"""
+    exports = []
+    for run, cache_dir in enumerate([None, tmp_path / "cache", tmp_path / "cache"]):
+        params = simulateur.SimulationParams(start_year=2021, end_year=2022, seed=6, batch_mode=batch_mode)
+        params.cache_dir = cache_dir and str(cache_dir)
+        params.export_formats = ["csv"]
+        params.output_dir = str(tmp_path / f"run-{run}")
+        params.report_path = str(tmp_path / f"report-{run}.json")
+        generator = simulateur.AccountingDataGenerator(params)
+        simulateur.run_simulation(generator)
+        exports.append(exported_bytes(tmp_path / f"run-{run}"))
+    assert generator.year_cache.hits == 2
+    assert exports[0] and exports[0] == exports[1] == exports[2]
+
+@pytest.mark.parametrize("format_name", ["csv", "parquet"])
+def test_appended_year_equals_a_full_run(tmp_path, format_name):
+    """Appending 2023 to a 2021-2022 export gives the tables of a 2021-2023 run, Bilan carrying 2022's closing"""
+    options = ["--seed", "7", "--formats", format_name]
+    simulateur.main(["--years", "2021-2022", "--output", str(tmp_path / "appended"), *options])
+    simulateur.main(["--years", "2021-2023", "--output", str(tmp_path / "appended"), "--append", *options])
+    simulateur.main(["--years", "2021-2023", "--output", str(tmp_path / "full"), *options])
+    appended, full = (simulateur.get_exporter(format_name, simulateur.SimulationParams(), str(tmp_path / name))
+                      for name in ["appended", "full"])
+    for table_name in simulateur.TABLE_NAMES:
+        tables = [exporter.read_table(table_name) for exporter in [appended, full]]
+        if table_name in simulateur.APPENDED_TABLES:
+            # Appended rows follow the exported ones
+            tables = [df.sort_values(list(df.columns), ignore_index=True) for df in tables]
+        pd.testing.assert_frame_equal(*tables, check_dtype=False, obj=table_name)
+
+def test_benchmark_flags_superlinear_stages():
+    """Stage times growing with rows ** 2 are flagged, linear ones are not; compare_results gives after / before"""
+    import benchmark_simulateur as benchmark
+    cases = [{"years": 1, "volume": volume, "stages": {stage: {"rows": 1000 * volume, "wall_s": 0.01 * volume ** (2 if stage == "salaries" else 1)}
+                                                     for stage in benchmark.STAGES}} for volume in [1, 2, 4]]
+    scaling = benchmark.scaling_exponents(cases)
+    assert scaling["salaries"] == {"exponent": 2.0, "superlinear": True}
+    assert scaling["invoices"] == {"exponent": 1.0, "superlinear": False}
+    ratios = benchmark.compare_results({"cases": cases}, {"cases": cases[1:]})
+    assert ratios["invoices"] == {"1y_x2": 1.0, "1y_x4": 1.0}
+
+def test_benchmark_measures_every_stage():
+    """Every stage of every matrix point gets rows, times and a memory peak, and the results are plain JSON"""
+    import benchmark_simulateur as benchmark
+    results = json.loads(json.dumps(benchmark.run_benchmarks(year_spans=[1, 2], volumes=[1])))
+    assert [(case["years"], case["volume"]) for case in results["cases"]] == [(1, 1), (2, 1)]
+    for case in results["cases"]:
+        assert sorted(case["stages"]) == sorted(benchmark.STAGES)
+        assert all(stage["rows"] > 0 and stage["tracemalloc_peak_bytes"] > 0 for stage in case["stages"].values())
+    assert sorted(results["scaling"]) == sorted(benchmark.STAGES)
+
+def test_partner_and_staff_counts_scale():
+    """Tens of thousands of partners and hundreds of employees: ID-indexed tables, valid invoice IDs, one payslip per employee on staff"""
+    params = simulateur.SimulationParams(start_year=2023, end_year=2023, seed=8, batch_mode=True,
+                                         supplier_count=20000, client_count=30000, employee_count=300)
+    generator = simulateur.AccountingDataGenerator(params)
+    tables = generator.generate_reference_tables()
+    assert tables["Fournisseurs"]["IDFournisseur"].tolist() == list(range(1, 20001))
+    assert tables["Clients"]["IDClient"].tolist() == list(range(1, 30001))
+    journal_df, fournisseurs, clients = generator.generate_year_from_stream(2023, 1)
+    assert fournisseurs["IDFournisseur"].between(1, 20000).all() and fournisseurs["IDFournisseur"].nunique() > 40
+    assert clients["IDClient"].between(1, 30000).all() and clients["IDClient"].nunique() > 50
+    gross = journal_df[(journal_df["CompteDebit"] == 5200) & (journal_df["CompteCredit"] == 2299)]
+    months = simulateur.ledger_dates(gross).dt.month
+    for month in range(1, 13):
+        start = pd.Timestamp(2023, month, 1)
+        end = start + pd.offsets.MonthEnd(0)
+        salaries = [employee.SalaireMensuel for employee in generator.employees_df.itertuples()
+                    if employee.DateEntree <= end and (pd.isna(employee.DateSortie) or employee.DateSortie >= start)]
+        assert (months == month).sum() == len(salaries)
+        assert gross.loc[months == month, "MontantDebit"].sum() == pytest.approx(sum(salaries))
+
+def test_monthly_balances_match_a_row_by_row_count(generated):
+    """BalanceMensuelle against sums over the ledger rows, per account and month, and summed over analytic codes"""
+    generator, data = generated
+    rows = [(datetime.strptime(row["Date"], "%d.%m.%Y"), row)
+            for row in simulateur.render_dates(data["GrandLivre"]).to_dict("records")]
+    balances = data["BalanceMensuelle"].set_index(["Compte", "Annee", "Mois"])
+    for account in [1010, 1100, 2000, 2299, 3400, 5200]:
+        sign = -1 if generator.accounts[account]["category"] == "Passif" else 1
+        solde = 0.0
+        for year in [2021, 2022]:
+            closing = 0.0
+            for month in range(1, 13):
+                month_rows = [row for date, row in rows if (date.year, date.month) == (year, month)]
+                debit = sum(row["MontantDebit"] for row in month_rows if row["CompteDebit"] == account)
+                credit = sum(row["MontantCredit"] for row in month_rows if row["CompteCredit"] == account)
+                expected = {"SoldeOuverture": closing, "Debit": debit, "Credit": credit}
+                closing += sign * (debit - credit)
+                solde += sign * (debit - credit)
+                expected.update(SoldeCloture=closing, Solde=solde)
+                actual = balances.loc[(account, year, month), list(expected)]
+                assert actual.to_dict() == pytest.approx(expected, abs=0.01), (account, year, month)
+    params = copy.copy(generator.params)
+    params.balance_by_analytic_code = True
+    by_code = simulateur.AccountingDataGenerator(params).generate_monthly_balances(data["GrandLivre"])
+    assert set(by_code["CodeAnalytique"]) >= {"A001", "A002"}
+    summed = by_code.groupby(["Compte", "Annee", "Mois"])[["Debit", "Credit", "Solde"]].sum()
+    expected = balances.loc[summed.index, ["Debit", "Credit", "Solde"]]
+    pd.testing.assert_frame_equal(summed, expected, check_exact=False, atol=0.01)
+
+def test_sqlite_export_is_a_keyed_star_schema(generated, tmp_path):
+    """Every table reads back; declared keys, foreign keys and indexes are in the database and the facts satisfy them"""
+    import sqlite3
+    generator, data = generated
+    params = copy.copy(generator.params)
+    params.sqlite_batch_size = 300
+    exporter = simulateur.get_exporter("sqlite", params, str(tmp_path))
+    exporter.export_all_data(data)
+    assert_exported(exporter, data)
+    connection = sqlite3.connect(exporter.dataset_path)
+    try:
+        for table_name, keys in simulateur.SQLITE_KEYS.items():
+            columns = {row[1]: row[5] for row in connection.execute(f'PRAGMA table_info("{table_name}")')}
+            primary_key = keys.get("primary_key") or [keys[name] for name in ["surrogate_key"] if name in keys]
+            assert [column for column, position in sorted(columns.items(), key=lambda item: item[1]) if position] == primary_key
+            foreign_keys = {row[3]: (row[2], row[4]) for row in connection.execute(f'PRAGMA foreign_key_list("{table_name}")')}
+            assert foreign_keys == {column: target for column, target in keys.get("foreign_keys", {}).items() if column in columns}
+        indexes = {tuple(row[2] for row in connection.execute(f'PRAGMA index_info("{name}")'))
+                   for (name,) in connection.execute("SELECT name FROM sqlite_master WHERE type = 'index' AND name LIKE 'idx_%'")}
+        assert indexes == {tuple(columns) for _, columns in simulateur.SQLITE_INDEXES}
+        assert connection.execute("PRAGMA foreign_key_check").fetchall() == []
+    finally:
+        connection.close()
+
+def test_dim_date_covers_every_fact_date(generated):
+    """DimDate has one French-labelled row per day, and every fact date's key points at its own day"""
+    _, data = generated
+    jours = ["lundi", "mardi", "mercredi", "jeudi", "vendredi", "samedi", "dimanche"]
+    mois = ["janvier", "février", "mars", "avril", "mai", "juin", "juillet", "août", "septembre", "octobre", "novembre", "décembre"]
+    dim_date = data["DimDate"].to_dict("records")
+    assert [row["Date"] for row in dim_date][:2] == ["01.01.2021", "02.01.2021"]
+    for row, next_row in zip(dim_date, dim_date[1:]):
+        assert (datetime.strptime(next_row["Date"], "%d.%m.%Y") - datetime.strptime(row["Date"], "%d.%m.%Y")).days == 1
+    for row in dim_date:
+        date = datetime.strptime(row["Date"], "%d.%m.%Y")
+        quarter = (date.month + 2) // 3
+        assert row == {**row, "CleDate": int(date.strftime("%Y%m%d")), "Jour": date.day, "JourSemaine": date.isoweekday(),
+                       "NomJour": jours[date.weekday()], "SemaineISO": date.isocalendar()[1], "Mois": date.month,
+                       "NomMois": mois[date.month - 1], "LibelleMois": f"{mois[date.month - 1]} {date.year}",
+                       "Trimestre": quarter, "LibelleTrimestre": f"T{quarter} {date.year}", "Annee": date.year, "Exercice": date.year}
+    keys = {row["CleDate"] for row in dim_date}
+    for table_name in ["GrandLivre", "FacturesFournisseurs", "FacturesClients", "CotationsDevises"]:
+        df = data[table_name]
+        for column in [column for column in simulateur.DATE_COLUMNS if column in df.columns]:
+            dates = simulateur.ledger_dates(df, column)
+            key = df[f"Cle{column}"]
+            assert key.isna().equals(dates.isna())
+            assert (key.dropna() == dates.dropna().dt.strftime("%Y%m%d").astype(int)).all()
+            assert set(key.dropna()) <= keys, (table_name, column)
+
+def test_scenario_distribution_matches_run_by_run_statements():
+    """The sweep's batched percentiles equal those of each run's own Bilan and EtatDeResultat"""
+    params = simulateur.SimulationParams(start_year=2023, end_year=2024, seed=3)
+    params.scenarios = [{"nom": "base"}, {"nom": "tva_9", "tva_rates": {"2024": 9.0}, "volume": 0.5}]
+    params.scenario_runs = 5
+    params.scenario_percentiles = [10, 50, 90]
+    distribution = simulateur.run_scenario_sweep(params)["DistributionScenarios"].set_index(["Scenario", "Etat", "Compte", "Annee"])
+    seed_entropy = np.random.SeedSequence(params.seed).entropy
+    for scenario in params.scenarios:
+        amounts = []
+        for run in range(params.scenario_runs):
+            generator = simulateur.AccountingDataGenerator(simulateur.scenario_params(params, scenario), seed_entropy)
+            generator.use_random_streams(generator.stream_seed_sequence(simulateur.SCENARIO_STREAM, run))
+            bilan, resultat = generator.generate_financial_statements(generator.generate_accounting_data_batch()[0])
+            values = {}
+            for etat, statement, prefix in [("Bilan", bilan, "SoldeExercice"), ("EtatDeResultat", resultat, "MontantExercice")]:
+                for row in statement.to_dict("records"):
+                    for index, year in enumerate([2023, 2024], 1):
+                        values[(etat, row["Compte"], year)] = row[f"{prefix}{index}"]
+            amounts.append(pd.Series(values))
+        amounts = pd.concat(amounts, axis=1)
+        expected = distribution.loc[scenario["nom"]].loc[amounts.index]
+        assert np.allclose(expected["Moyenne"], amounts.mean(axis=1), atol=0.01)
+        for percentile in params.scenario_percentiles:
+            assert np.allclose(expected[f"P{percentile}"], np.percentile(amounts, percentile, axis=1), atol=0.01)
+
+def test_ageing_and_payment_days_match_a_brute_force_count(generated):
+    """Buckets, open counts and DSO/DPO against a month-end by month-end walk over the invoices"""
+    _, data = generated
+    delais = data["DelaisPaiement"].set_index(["Annee", "Mois"])
+    for table_name, (id_column, ageing_table), (open_name, invoiced_name, ratio_name) in [
+            ("FacturesClients", simulateur.AGEING_TABLES["FacturesClients"], ("CreancesOuvertes", "Ventes90Jours", "DSO")),
+            ("FacturesFournisseurs", simulateur.AGEING_TABLES["FacturesFournisseurs"], ("DettesOuvertes", "Achats90Jours", "DPO"))]:
+        invoices = [(row[id_column], datetime.strptime(row["DateFacture"], "%d.%m.%Y"),
+                     datetime.strptime(row["DatePaiement"], "%d.%m.%Y") if row["StatutFacture"] == "ERLED" else None, row["MontantCHF"])
+                    for row in data[table_name].to_dict("records")]
+        ageing = data[ageing_table].set_index([id_column, "Annee", "Mois"])
+        rows = 0
+        for year in [2021, 2022]:
+            for month in range(1, 13):
+                month_end = (pd.Timestamp(year, month, 1) + pd.offsets.MonthEnd(0)).to_pydatetime()
+                expected = {}
+                open_total = invoiced = 0.0
+                for partner, issued, paid, montant in invoices:
+                    if 0 <= (month_end - issued).days < simulateur.PAYMENT_DAYS_WINDOW:
+                        invoiced += montant
+                    if issued <= month_end and (paid is None or paid > month_end):
+                        age = (month_end - issued).days
+                        bucket = "Tranche0_30" if age <= 30 else "Tranche31_60" if age <= 60 else "Tranche61_90" if age <= 90 else "TrancheSup90"
+                        cell = expected.setdefault(partner, {"Tranche0_30": 0.0, "Tranche31_60": 0.0, "Tranche61_90": 0.0,
+                                                             "TrancheSup90": 0.0, "TotalOuvert": 0.0, "FacturesOuvertes": 0})
+                        cell[bucket] += montant
+                        cell["TotalOuvert"] += montant
+                        cell["FacturesOuvertes"] += 1
+                        open_total += montant
+                for partner, cell in expected.items():
+                    assert ageing.loc[(partner, year, month), list(cell)].to_dict() == pytest.approx(cell, abs=0.01)
+                rows += len(expected)
+                payment_days = delais.loc[(year, month)]
+                assert payment_days[open_name] == pytest.approx(open_total, abs=0.01)
+                assert payment_days[invoiced_name] == pytest.approx(invoiced, abs=0.01)
+                assert payment_days[ratio_name] == pytest.approx(open_total * simulateur.PAYMENT_DAYS_WINDOW / invoiced, abs=0.05)
+        # Only the partners with open invoices have a row
+        assert rows == len(ageing)